@@ -1,38 +1,115 @@
 """ReAct LangGraph agent for todo management"""
+import asyncio
+import hashlib
 import os
 import json
+import logging
+import time
 from datetime import datetime
-from pathlib import Path
+from typing import Any
 
 # Load environment variables before other imports that depend on them
-from dotenv import load_dotenv
-project_root = Path(__file__).parent.parent
-env_file = project_root / ".env"
-load_dotenv(dotenv_path=env_file)
+from backend import _env  # noqa: F401
 
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain_core.tools import tool
 from langchain.agents import create_agent
+from langchain.agents.middleware import dynamic_prompt
+from langchain_collapse import CollapseMiddleware
 
 from backend.config import settings
-from .mcp_client import create_mcp_tools
+from .mcp_client import create_mcp_tools, MCPClientManager
 from .utils import format_system_prompt
 
 
+logger = logging.getLogger(__name__)
+
+# Message classes for dict-style history entries, keyed by role
+_ROLE_MESSAGE_CLASSES = {"user": HumanMessage, "assistant": AIMessage}
+
+
+# Built agents keyed by (token hash, model name), so follow-up chat turns skip
+# LLM client setup, tool binding and graph compilation. An agent is only
+# usable while its token is, so entries live as long as an access token.
+AGENT_CACHE_TTL_SECONDS = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60.0
+AGENT_CACHE_MAX_ENTRIES = 1024
+_agent_cache: dict[tuple[str, str], tuple[Any, MCPClientManager, float]] = {}
+# In-flight builds keyed like the cache: concurrent first turns for one token
+# share a build while other tokens build in parallel
+_agent_builds: dict[tuple[str, str], asyncio.Future] = {}
+
+
+def _token_hash(auth_token: str) -> str:
+    return hashlib.sha256(auth_token.encode()).hexdigest()
+
+
+def _is_fresh(entry: tuple[Any, MCPClientManager, float], now: float) -> bool:
+    _, manager, created_at = entry
+    # A manager swept from the MCP pool is disconnected; rebuild so the agent
+    # picks up a pooled one again
+    return now - created_at < AGENT_CACHE_TTL_SECONDS and manager.is_connected
+
+
+def invalidate_agent_cache(auth_token: str):
+    """Drop cached agents built for this token (e.g. on logout)"""
+    token_hash = _token_hash(auth_token)
+    for key in [key for key in _agent_cache if key[0] == token_hash]:
+        del _agent_cache[key]
+
+
+@dynamic_prompt
+def _system_prompt(request) -> str:
+    # Rendered per model call so a cached agent always sees the current date
+    return format_system_prompt(datetime.now())
+
+
 async def create_react_agent(
     auth_token: str, 
     api_base_url: str = "http://localhost:8000", 
     model_name: str = "gpt-4o-mini"
 ):
+    """Create a ReAct agent with MCP tools, reusing a cached one when fresh
+    
+    Called once per chat turn. The user may have changed todos outside the
+    agent (e.g. in the web UI) since the last turn, so a reused agent's cached
+    tool results are dropped; they only cover repeated calls within a turn.
+    """
+    key = (_token_hash(auth_token), model_name)
+    entry = _agent_cache.get(key)
+    if entry is not None and _is_fresh(entry, time.monotonic()):
+        agent, mcp_manager, _ = entry
+        mcp_manager.invalidate_cache()
+        return agent
+    
+    build = _agent_builds.get(key)
+    if build is None:
+        build = asyncio.ensure_future(_build_cached_agent(key, auth_token, api_base_url, model_name))
+        _agent_builds[key] = build
+        build.add_done_callback(lambda _: _agent_builds.pop(key, None))
+    # Shielded so one waiter being cancelled doesn't abort the others' build
+    return await asyncio.shield(build)
+
+
+async def _build_cached_agent(key: tuple[str, str], auth_token: str, api_base_url: str, model_name: str):
+    agent, mcp_manager = await _build_agent(auth_token, api_base_url, model_name)
+    now = time.monotonic()
+    # Drop expired entries so tokens that are no longer used don't pile up
+    for stale_key in [k for k, v in _agent_cache.items() if not _is_fresh(v, now)]:
+        del _agent_cache[stale_key]
+    # Still full: evict the oldest (dicts keep insertion order)
+    while len(_agent_cache) >= AGENT_CACHE_MAX_ENTRIES:
+        del _agent_cache[next(iter(_agent_cache))]
+    _agent_cache[key] = (agent, mcp_manager, now)
+    return agent
+
+
+async def _build_agent(auth_token: str, api_base_url: str, model_name: str):
     """Create a ReAct agent with MCP tools using LangChain's create_agent"""
     
     # Get tools from MCP server
     tools, mcp_manager = await create_mcp_tools(auth_token, api_base_url)
     
-    # Store manager for cleanup (could be improved with proper lifecycle management)
-    # For now, we'll keep the connection alive for the agent's lifetime
-    
     # Initialize LLM
     openai_api_key = settings.OPENAI_API_KEY or os.getenv("OPENAI_API_KEY")
     if not openai_api_key:
@@ -47,17 +124,22 @@ async def create_react_agent(
     agent = create_agent(
         llm,
         tools,
-        system_prompt=format_system_prompt(datetime.now())
+        middleware=[
+            _system_prompt,
+            # Replace older repeated read-only tool results with a one-line note
+            # so they don't get resent to the model on every step
+            CollapseMiddleware(
+                collapse_tools=frozenset({"list_todos", "get_todo"}),
+                min_group_size=2
+            )
+        ]
     )
     
-    return agent
+    return agent, mcp_manager
 
 
 async def chat_with_agent(agent, user_message: str, conversation_history: list = None) -> str:
     """Chat with the agent"""
-    import traceback
-    import sys
-    
     try:
         if conversation_history is None:
             conversation_history = []
@@ -67,16 +149,14 @@ async def chat_with_agent(agent, user_message: str, conversation_history: list =
         
         # Add conversation history
         for msg in conversation_history:
-            if isinstance(msg, HumanMessage) or isinstance(msg, AIMessage):
+            msg_type = type(msg)
+            if msg_type is HumanMessage or msg_type is AIMessage:
                 messages.append(msg)
-            elif isinstance(msg, dict):
+            elif msg_type is dict:
                 # Handle dict format
-                role = msg.get("role")
-                content = msg.get("content", "")
-                if role == "user":
-                    messages.append(HumanMessage(content=content))
-                elif role == "assistant":
-                    messages.append(AIMessage(content=content))
+                message_class = _ROLE_MESSAGE_CLASSES.get(msg.get("role"))
+                if message_class is not None:
+                    messages.append(message_class(content=msg.get("content", "")))
         
         # Add user message
         messages.append(HumanMessage(content=user_message))
@@ -85,16 +165,12 @@ async def chat_with_agent(agent, user_message: str, conversation_history: list =
         result = await agent.ainvoke({"messages": messages})
         
         # Extract the last AI message
-        ai_messages = [msg for msg in result["messages"] if isinstance(msg, AIMessage)]
-        if ai_messages:
-            return ai_messages[-1].content
+        for msg in reversed(result["messages"]):
+            if isinstance(msg, AIMessage):
+                return msg.content
         
         return "I'm sorry, I couldn't process your request."
     except Exception as e:
-        error_detail = str(e)
-        error_traceback = traceback.format_exc()
-        print(f"Agent chat error: {error_detail}", file=sys.stderr)
-        print(f"Traceback: {error_traceback}", file=sys.stderr)
-        sys.stderr.flush()
+        logger.exception("Agent chat error: %s", e)
         raise
 
@@ -4,7 +4,14 @@ from typing import Optional, Dict, Any
 
 
 class APIClient:
-    """Simple API client for making authenticated requests"""
+    """Simple API client for making authenticated requests
+    
+    The underlying httpx.AsyncClient is created on first use and reused for
+    every request so connections to the backend are kept alive and pooled.
+    HTTP/2 is enabled so concurrent requests can be multiplexed over a single
+    connection; httpx falls back to HTTP/1.1 when the server does not offer it.
+    Call aclose() when the client is no longer needed.
+    """
     
     def __init__(self, auth_token: str, base_url: str = "http://localhost:8000"):
         self.auth_token = auth_token
@@ -13,6 +20,19 @@ class APIClient:
             "Authorization": f"Bearer {auth_token}",
             "Content-Type": "application/json"
         }
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared HTTP client, creating it on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                http2=True,
+                timeout=httpx.Timeout(30.0, connect=5.0),
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+            )
+        return self._client
     
     async def _request(
         self, 
@@ -22,17 +42,15 @@ class APIClient:
         json_data: Optional[Dict] = None
     ) -> Dict[str, Any]:
         """Make an HTTP request"""
-        url = f"{self.base_url}{endpoint}"
-        async with httpx.AsyncClient() as client:
-            response = await client.request(
-                method=method,
-                url=url,
-                params=params,
-                json=json_data,
-                headers=self.headers
-            )
-            response.raise_for_status()
-            return response.json()
+        client = self._get_client()
+        response = await client.request(
+            method=method,
+            url=endpoint,
+            params=params,
+            json=json_data
+        )
+        response.raise_for_status()
+        return response.json()
     
     async def get(self, endpoint: str, params: Optional[Dict] = None) -> Dict[str, Any]:
         """GET request"""
@@ -49,4 +67,9 @@ class APIClient:
     async def delete(self, endpoint: str) -> Dict[str, Any]:
         """DELETE request"""
         return await self._request("DELETE", endpoint)
-
+    
+    async def aclose(self):
+        """Close the underlying HTTP client and release pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
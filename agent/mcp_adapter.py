@@ -1,11 +1,20 @@
-"""MCP adapter for making API calls to the backend"""
-from typing import Dict, Any
+"""MCP adapter for making API calls to the backend
+
+Each factory accepts an optional shared APIClient so that several calls can
+reuse a single connection pool instead of each opening their own. Use
+build_mcp_calls() to get all of them bound to one client.
+"""
+from typing import Dict, Any, Optional, Callable, Awaitable
 from .api_client import APIClient
 
 
-async def create_todo_mcp_call(auth_token: str, api_base_url: str = "http://localhost:8000"):
+async def create_todo_mcp_call(
+    auth_token: str,
+    api_base_url: str = "http://localhost:8000",
+    client: Optional[APIClient] = None
+):
     """Factory function to create a todo creation MCP call"""
-    client = APIClient(auth_token, api_base_url)
+    client = client or APIClient(auth_token, api_base_url)
     
     async def _call(arguments: dict) -> Dict[str, Any]:
         data = {k: v for k, v in arguments.items() if v is not None}
@@ -14,9 +23,31 @@ async def create_todo_mcp_call(auth_token: str, api_base_url: str = "http://loca
     return _call
 
 
-async def list_todos_mcp_call(auth_token: str, api_base_url: str = "http://localhost:8000"):
+async def create_todos_mcp_call(
+    auth_token: str,
+    api_base_url: str = "http://localhost:8000",
+    client: Optional[APIClient] = None
+):
+    """Factory function to create a bulk todo creation MCP call"""
+    client = client or APIClient(auth_token, api_base_url)
+    
+    async def _call(arguments: dict) -> list[Dict[str, Any]]:
+        data = [
+            {k: v for k, v in item.items() if v is not None}
+            for item in arguments["items"]
+        ]
+        return await client.post("/api/todos/bulk", json_data=data)
+    
+    return _call
+
+
+async def list_todos_mcp_call(
+    auth_token: str,
+    api_base_url: str = "http://localhost:8000",
+    client: Optional[APIClient] = None
+):
     """Factory function to create a todo listing MCP call"""
-    client = APIClient(auth_token, api_base_url)
+    client = client or APIClient(auth_token, api_base_url)
     
     async def _call(arguments: dict) -> Dict[str, Any]:
         params = {k: v for k, v in arguments.items() if v is not None}
@@ -25,9 +56,13 @@ async def list_todos_mcp_call(auth_token: str, api_base_url: str = "http://local
     return _call
 
 
-async def get_todo_mcp_call(auth_token: str, api_base_url: str = "http://localhost:8000"):
+async def get_todo_mcp_call(
+    auth_token: str,
+    api_base_url: str = "http://localhost:8000",
+    client: Optional[APIClient] = None
+):
     """Factory function to create a todo retrieval MCP call"""
-    client = APIClient(auth_token, api_base_url)
+    client = client or APIClient(auth_token, api_base_url)
     
     async def _call(arguments: dict) -> Dict[str, Any]:
         todo_id = arguments["todo_id"]
@@ -36,9 +71,13 @@ async def get_todo_mcp_call(auth_token: str, api_base_url: str = "http://localho
     return _call
 
 
-async def update_todo_mcp_call(auth_token: str, api_base_url: str = "http://localhost:8000"):
+async def update_todo_mcp_call(
+    auth_token: str,
+    api_base_url: str = "http://localhost:8000",
+    client: Optional[APIClient] = None
+):
     """Factory function to create a todo update MCP call"""
-    client = APIClient(auth_token, api_base_url)
+    client = client or APIClient(auth_token, api_base_url)
     
     async def _call(arguments: dict) -> Dict[str, Any]:
         todo_id = arguments.pop("todo_id")
@@ -48,9 +87,13 @@ async def update_todo_mcp_call(auth_token: str, api_base_url: str = "http://loca
     return _call
 
 
-async def delete_todo_mcp_call(auth_token: str, api_base_url: str = "http://localhost:8000"):
+async def delete_todo_mcp_call(
+    auth_token: str,
+    api_base_url: str = "http://localhost:8000",
+    client: Optional[APIClient] = None
+):
     """Factory function to create a todo deletion MCP call"""
-    client = APIClient(auth_token, api_base_url)
+    client = client or APIClient(auth_token, api_base_url)
     
     async def _call(arguments: dict) -> Dict[str, Any]:
         todo_id = arguments["todo_id"]
@@ -59,3 +102,25 @@ async def delete_todo_mcp_call(auth_token: str, api_base_url: str = "http://loca
     
     return _call
 
+
+
+async def build_mcp_calls(
+    auth_token: str,
+    api_base_url: str = "http://localhost:8000"
+) -> tuple[Dict[str, Callable[[dict], Awaitable[Dict[str, Any]]]], APIClient]:
+    """Create all MCP calls bound to a single shared APIClient.
+    
+    Returns:
+        Tuple of (dict of tool name to call, APIClient instance). The caller
+        owns the client and should await client.aclose() when done.
+    """
+    client = APIClient(auth_token, api_base_url)
+    calls = {
+        "create_todo": await create_todo_mcp_call(auth_token, api_base_url, client),
+        "create_todos": await create_todos_mcp_call(auth_token, api_base_url, client),
+        "list_todos": await list_todos_mcp_call(auth_token, api_base_url, client),
+        "get_todo": await get_todo_mcp_call(auth_token, api_base_url, client),
+        "update_todo": await update_todo_mcp_call(auth_token, api_base_url, client),
+        "delete_todo": await delete_todo_mcp_call(auth_token, api_base_url, client),
+    }
+    return calls, client
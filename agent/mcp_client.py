@@ -1,35 +1,128 @@
 """MCP client adapter for connecting to the MCP server"""
+import asyncio
+import hashlib
 import json
+import logging
 import os
 import sys
+import time
+from collections import OrderedDict
 from pathlib import Path
 from typing import List, Any, Optional
 from langchain_core.tools import tool
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
+from mcp_server.server import TOOL_HANDLERS, TokenStore, close_clients
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
+
+
+# Read-only tools whose results may be served from the cache
+CACHEABLE_TOOLS = frozenset({"list_todos", "get_todo"})
+CACHE_TTL_SECONDS = 30.0
+CACHE_MAX_ENTRIES = 256
+# Upper bound on concurrent in-flight tool calls per MCP session
+MAX_CONCURRENT_TOOL_CALLS = 8
+# "inprocess" (default) calls the MCP server's tool handlers directly;
+# "stdio" runs mcp_server/server.py as a subprocess and talks MCP over stdio
+MCP_TRANSPORT = os.getenv("MCPCLIENT_TRANSPORT", "inprocess")
+# Pooled managers idle for longer than this are shut down
+MANAGER_IDLE_TTL_SECONDS = 600.0
+MANAGER_SWEEP_INTERVAL_SECONDS = 60.0
+
+logger = logging.getLogger(__name__)
+
+
+_PRIMITIVE_TYPES = (str, int, float, bool, type(None))
+
+
+def _cache_key(tool_name: str, arguments: dict) -> tuple:
+    """Build a hashable cache key for a tool call
+    
+    Tool arguments are almost always flat primitives, for which a sorted
+    items tuple is much cheaper than serializing to JSON.
+    """
+    if all(isinstance(v, _PRIMITIVE_TYPES) for v in arguments.values()):
+        return (tool_name, tuple(sorted(arguments.items())))
+    return (tool_name, _dumps_sorted(arguments))
+
+
+def _dumps_sorted(obj: Any) -> bytes:
+    """Serialize obj to canonical (key-sorted) JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS, default=str)
+    return json.dumps(obj, sort_keys=True, default=str).encode()
 
 
 class MCPClientManager:
     """Manages MCP server connection and provides tool access"""
     
-    def __init__(self, auth_token: str, api_base_url: str = "http://localhost:8000"):
+    def __init__(
+        self,
+        auth_token: str,
+        api_base_url: str = "http://localhost:8000",
+        transport: str = MCP_TRANSPORT
+    ):
         self.auth_token = auth_token
         self.api_base_url = api_base_url
+        self.transport = transport
+        # Per-user credentials for in-process tool calls
+        self._token_store: Optional[TokenStore] = None
         self._session: Optional[ClientSession] = None
-        self._read = None
-        self._write = None
-        self._client_context = None
+        # Task that owns the stdio/session contexts for the subprocess lifetime
+        self._runner: Optional[asyncio.Task] = None
+        self._closing: Optional[asyncio.Event] = None
+        self.last_used = time.monotonic()
+        # LRU of tool results: _cache_key(...) -> (timestamp, result)
+        self._cache: OrderedDict[tuple, tuple[float, str]] = OrderedDict()
+        self._cache_ttl = CACHE_TTL_SECONDS
+        self._cacheable = CACHEABLE_TOOLS
+        # Bumped on every invalidation so in-flight reads don't store stale results
+        self._cache_generation = 0
+        # The MCP session multiplexes requests by id, so parallel tool calls
+        # from the agent can share it; just cap how many run at once.
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_TOOL_CALLS)
+        self._connect_lock = asyncio.Lock()
+    
+    @property
+    def is_connected(self) -> bool:
+        return self._session is not None or self._token_store is not None
     
     async def connect(self):
         """Connect to the MCP server
         
-        Each MCPClientManager instance creates its own isolated subprocess.
-        The subprocess receives its own copy of environment variables, ensuring
-        that concurrent users have separate MCP server instances with their own tokens.
+        In-process, this just binds the user's token to the tool handlers.
+        Over stdio, each MCPClientManager instance creates its own isolated
+        subprocess. The subprocess receives its own copy of environment variables,
+        ensuring that concurrent users have separate MCP server instances with
+        their own tokens.
         """
-        if self._session:
+        if self.is_connected:
             return  # Already connected
         
+        if self.transport == "inprocess":
+            self._token_store = TokenStore(self.auth_token, self.api_base_url)
+            return
+        
+        # Parallel tool calls may race to reconnect; only one should spawn
+        async with self._connect_lock:
+            if self._session:
+                return
+            
+            ready = asyncio.get_running_loop().create_future()
+            self._closing = asyncio.Event()
+            self._runner = asyncio.create_task(self._run_session(ready))
+            await ready
+    
+    async def _run_session(self, ready: asyncio.Future):
+        """Own the MCP subprocess and session until disconnect() is called
+        
+        The stdio and session context managers must be entered and exited from
+        the same task, so a pooled manager can be shut down from any task.
+        """
         # Create isolated environment for this subprocess
         # Each subprocess gets its own env dict, ensuring user isolation
         env = os.environ.copy()
@@ -47,43 +140,167 @@ class MCPClientManager:
             env=env
         )
         
-        # Create client connection - store context manager to keep it alive
-        self._client_context = stdio_client(server_params)
-        self._read, self._write = await self._client_context.__aenter__()
-        
-        # Create and initialize session - store to keep it alive
-        self._session = ClientSession(self._read, self._write)
-        await self._session.__aenter__()
-        await self._session.initialize()
+        try:
+            async with stdio_client(server_params) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    # Only publish the session once initialized so concurrent
+                    # callers never see a half-started session.
+                    self._session = session
+                    ready.set_result(None)
+                    await self._closing.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.exception("MCP session terminated unexpectedly")
+        finally:
+            self._session = None
+    
+    def invalidate_cache(self):
+        """Drop all cached tool results"""
+        self._cache.clear()
+        self._cache_generation += 1
     
     async def call_tool(self, tool_name: str, arguments: dict) -> str:
-        """Call an MCP tool and return the result as a string"""
-        if not self._session:
+        """Call an MCP tool and return the result as a string
+        
+        Results of read-only tools are cached for a short time so repeated
+        identical calls within a conversation skip the MCP/backend round-trip.
+        Any other tool may mutate todos, so calling one clears the cache.
+        """
+        self.last_used = time.monotonic()
+        cacheable = tool_name in self._cacheable
+        if cacheable:
+            key = _cache_key(tool_name, arguments)
+            cached = self._cache.get(key)
+            if cached is not None:
+                cached_at, cached_result = cached
+                if time.monotonic() - cached_at < self._cache_ttl:
+                    self._cache.move_to_end(key)
+                    return cached_result
+                del self._cache[key]
+        else:
+            self.invalidate_cache()
+        
+        generation = self._cache_generation
+        result = await self._call_tool_uncached(tool_name, arguments)
+        
+        if not cacheable:
+            # Reads that started before this mutation finished may be stale
+            self.invalidate_cache()
+        # Don't cache error responses from the MCP server
+        elif generation == self._cache_generation and not result.startswith("Error"):
+            self._cache[key] = (time.monotonic(), result)
+            while len(self._cache) > CACHE_MAX_ENTRIES:
+                self._cache.popitem(last=False)
+        return result
+    
+    async def _call_tool_uncached(self, tool_name: str, arguments: dict) -> str:
+        """Call an MCP tool on the server, bypassing the result cache"""
+        if not self.is_connected:
             await self.connect()
         
-        result = await self._session.call_tool(tool_name, arguments)
+        async with self._semaphore:
+            if self._token_store is not None:
+                handler = TOOL_HANDLERS.get(tool_name)
+                if handler is None:
+                    raise ValueError(f"Unknown tool: {tool_name}")
+                content = await handler(arguments, self._token_store)
+            else:
+                content = (await self._session.call_tool(tool_name, arguments)).content
         
-        # Extract text content
-        if result.content and len(result.content) > 0:
-            text_content = result.content[0].text
-            # Try to parse and reformat JSON for cleaner output
-            try:
-                if text_content.strip().startswith(("{", "[")):
-                    parsed = json.loads(text_content)
-                    return json.dumps(parsed, default=str, indent=2)
-                return text_content
-            except:
-                return text_content
+        # Extract text content; forwarded verbatim since the model reads
+        # compact JSON just as well as re-indented JSON
+        if content and len(content) > 0:
+            return content[0].text
         return json.dumps({"error": "No content returned"})
     
     async def disconnect(self):
         """Disconnect from the MCP server"""
-        if self._session:
-            await self._session.__aexit__(None, None, None)
-            self._session = None
-        if self._client_context:
-            await self._client_context.__aexit__(None, None, None)
-            self._client_context = None
+        self.invalidate_cache()
+        self._token_store = None
+        if self._runner:
+            self._closing.set()
+            await self._runner
+            self._runner = None
+            self._closing = None
+
+
+# Pool of connected managers keyed by a hash of (api_base_url, auth_token), so
+# a user's follow-up chat turns reuse their warm MCP subprocess. Keying on the
+# token keeps users isolated without holding raw tokens as dict keys.
+_manager_pool: dict[str, MCPClientManager] = {}
+# In-flight connects by pool key: concurrent requests for one key share a
+# connect while other users' subprocesses start in parallel
+_manager_connects: dict[str, asyncio.Future] = {}
+
+
+def _pool_key(auth_token: str, api_base_url: str) -> str:
+    return hashlib.sha256(f"{api_base_url}|{auth_token}".encode()).hexdigest()
+
+
+async def get_mcp_manager(auth_token: str, api_base_url: str = "http://localhost:8000") -> MCPClientManager:
+    """Return a connected MCPClientManager, reusing a pooled one when fresh"""
+    key = _pool_key(auth_token, api_base_url)
+    stale = None
+    manager = _manager_pool.get(key)
+    if manager is not None and time.monotonic() - manager.last_used >= MANAGER_IDLE_TTL_SECONDS:
+        stale, manager = _manager_pool.pop(key), None
+    if manager is None:
+        connect = _manager_connects.get(key)
+        if connect is None:
+            connect = asyncio.ensure_future(_connect_pooled_manager(key, auth_token, api_base_url))
+            _manager_connects[key] = connect
+            connect.add_done_callback(lambda _: _manager_connects.pop(key, None))
+        # Shielded so one waiter being cancelled doesn't abort the others' connect
+        manager = await asyncio.shield(connect)
+    manager.last_used = time.monotonic()
+    if stale is not None:
+        await stale.disconnect()
+    return manager
+
+
+async def _connect_pooled_manager(key: str, auth_token: str, api_base_url: str) -> MCPClientManager:
+    manager = MCPClientManager(auth_token, api_base_url)
+    await manager.connect()
+    _manager_pool[key] = manager
+    return manager
+
+
+async def sweep_idle_managers():
+    """Disconnect and drop pooled managers that have been idle too long"""
+    now = time.monotonic()
+    idle = [
+        key for key, manager in _manager_pool.items()
+        if now - manager.last_used >= MANAGER_IDLE_TTL_SECONDS
+    ]
+    expired = [_manager_pool.pop(key) for key in idle]
+    for manager in expired:
+        try:
+            await manager.disconnect()
+        except Exception:
+            logger.exception("Error disconnecting idle MCP manager")
+
+
+async def run_manager_sweeper(interval: float = MANAGER_SWEEP_INTERVAL_SECONDS):
+    """Periodically sweep idle managers; run as a background task"""
+    while True:
+        await asyncio.sleep(interval)
+        await sweep_idle_managers()
+
+
+async def close_all_managers():
+    """Disconnect every pooled manager (e.g. on application shutdown)"""
+    managers = list(_manager_pool.values())
+    _manager_pool.clear()
+    for manager in managers:
+        try:
+            await manager.disconnect()
+        except Exception:
+            logger.exception("Error disconnecting MCP manager")
+    # In-process tool calls share mcp_server's pooled HTTP clients
+    await close_clients()
 
 
 async def create_mcp_tools(auth_token: str, api_base_url: str = "http://localhost:8000") -> tuple[List[Any], MCPClientManager]:
@@ -92,8 +309,7 @@ async def create_mcp_tools(auth_token: str, api_base_url: str = "http://localhos
     Returns:
         Tuple of (list of LangChain tools, MCPClientManager instance)
     """
-    manager = MCPClientManager(auth_token, api_base_url)
-    await manager.connect()
+    manager = await get_mcp_manager(auth_token, api_base_url)
     
     # Note: We don't need to query the server for tools since we define them ourselves.
     # The MCP server has the tools registered, and we'll call them directly.
@@ -121,6 +337,27 @@ async def create_mcp_tools(auth_token: str, api_base_url: str = "http://localhos
                 return json.dumps({"error": str(e)})
         return await manager.call_tool("create_todo", arguments)
     
+    # Create create_todos tool
+    @tool
+    async def create_todos(items: list[dict]) -> str:
+        """Create several todo items in one call. Prefer this over calling create_todo repeatedly.
+        
+        Args:
+            items: The todos to create, each a dict with "name" (required) and optional "description" and "due_date" (ISO 8601 format or natural language)
+        """
+        todos = []
+        for item in items:
+            todo = {"name": item["name"]}
+            if item.get("description"):
+                todo["description"] = item["description"]
+            if item.get("due_date"):
+                try:
+                    todo["due_date"] = normalize_date(item["due_date"])
+                except ValueError as e:
+                    return json.dumps({"error": str(e)})
+            todos.append(todo)
+        return await manager.call_tool("create_todos", {"items": todos})
+    
     # Create list_todos tool
     @tool
     async def list_todos(search: str = None, sort_by: str = "creation_date", sort_order: str = "desc") -> str:
@@ -196,6 +433,6 @@ async def create_mcp_tools(auth_token: str, api_base_url: str = "http://localhos
         """
         return await manager.call_tool("delete_todo", {"todo_id": todo_id})
     
-    langchain_tools = [create_todo, list_todos, get_todo, update_todo, toggle_todo_complete, delete_todo]
+    langchain_tools = [create_todo, create_todos, list_todos, get_todo, update_todo, toggle_todo_complete, delete_todo]
     
     return langchain_tools, manager
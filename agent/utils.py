@@ -1,6 +1,7 @@
 """Utility functions for the agent"""
+from functools import lru_cache
 from typing import Optional
-from datetime import timedelta
+from datetime import date, datetime, timedelta
 from dateutil import parser
 
 
@@ -19,6 +20,20 @@ def normalize_date(date_str: Optional[str]) -> Optional[str]:
     if not date_str or not date_str.strip():
         return None
     
+    # dateutil fills missing fields from today's date, so results are only
+    # reusable for the same day
+    return _normalize_date_cached(date_str.strip(), date.today().toordinal())
+
+
+@lru_cache(maxsize=1024)
+def _normalize_date_cached(date_str: str, today_ordinal: int) -> str:
+    # Fast path: the system prompt asks the model for ISO 8601, which the
+    # C-implemented fromisoformat handles far faster than dateutil
+    try:
+        return datetime.fromisoformat(date_str).isoformat()
+    except ValueError:
+        pass
+    
     try:
         parsed_date = parser.parse(date_str)
         return parsed_date.isoformat()
@@ -29,8 +44,15 @@ def normalize_date(date_str: Optional[str]) -> Optional[str]:
         )
 
 
-def format_system_prompt(now) -> str:
+def format_system_prompt(now: datetime) -> str:
     """Generate system prompt with current date information."""
+    # The prompt has minute resolution, so every agent created within the
+    # same minute shares one cached string.
+    return _format_system_prompt_cached(now.replace(second=0, microsecond=0))
+
+
+@lru_cache(maxsize=8)
+def _format_system_prompt_cached(now: datetime) -> str:
     current_date = now.strftime("%A, %B %d, %Y")
     current_time = now.strftime("%I:%M %p")
     tomorrow = (now + timedelta(days=1)).strftime("%Y-%m-%d")
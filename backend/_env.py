@@ -0,0 +1,12 @@
+"""Load the project .env file once per process.
+
+Import this module before reading configuration from the environment; the
+module cache ensures the file is only read on first import.
+"""
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Resolve path relative to project root
+project_root = Path(__file__).parent.parent
+env_file = project_root / ".env"
+load_dotenv(dotenv_path=env_file)
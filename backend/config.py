@@ -1,13 +1,8 @@
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import Optional
-from dotenv import load_dotenv
 import os
-from pathlib import Path
 
-# Load .env file explicitly - resolve path relative to project root
-project_root = Path(__file__).parent.parent
-env_file = project_root / ".env"
-load_dotenv(dotenv_path=env_file)
+from . import _env  # noqa: F401  (loads .env before settings are read)
 
 
 class Settings(BaseSettings):
@@ -16,10 +11,16 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
     API_BASE_URL: str = os.getenv("API_BASE_URL", "http://localhost:8000")
     OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY")
-    
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
+    DATABASE_URL: Optional[str] = os.getenv("DATABASE_URL")
+    DEBUG: bool = os.getenv("DEBUG", "false").lower() in ("1", "true", "yes")
+    # Connection pool, per worker process: total DB connections are
+    # WEB_CONCURRENCY * (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", str(max(10, 2 * (os.cpu_count() or 1)))))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+
+    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
 
 settings = Settings()
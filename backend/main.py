@@ -1,20 +1,29 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Query
+import anyio.to_thread
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+from fastapi import FastAPI, Body, Depends, HTTPException, Request, status, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, asc, desc
-from typing import Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, raiseload
+from sqlalchemy import and_, or_, asc, case, delete, desc, func, insert, literal, select, text, tuple_, update
+from typing import Any, Optional, Union
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 
-from .database import get_db, init_db, Todo, User
+from .database import get_db, init_db, fts_match_query, todos_fts, tsv_match, utcnow, Todo, User
 from .auth import (
     get_current_user,
     authenticate_user,
     create_access_token,
     get_password_hash,
-    get_user_by_username,
-    get_user_by_email,
+    invalidate_cached_user,
     oauth2_scheme,
 )
 from .schemas import (
@@ -23,11 +32,26 @@ from .schemas import (
     Token,
     TodoCreate,
     TodoUpdate,
+    TodoBulkUpdate,
+    TodoBulkDelete,
     TodoResponse,
+    TodoFieldsResponse,
     TodoListResponse,
+    TodoCursorListResponse,
+    SortField,
+    SortOrder,
+    CompletedFilter,
+    SearchMode,
+    PaginationMode,
 )
 from .config import settings
 
+# Imported once at startup: LangChain takes hundreds of ms to import
+from agent.agent import create_react_agent, chat_with_agent as run_agent_chat, invalidate_agent_cache
+from agent.mcp_client import close_all_managers, run_manager_sweeper
+
+logger = logging.getLogger(__name__)
+
 app = FastAPI(title="Todo API", version="1.0.0")
 
 
@@ -40,12 +64,137 @@ class ChatResponse(BaseModel):
     response: str
 
 
-def get_todo_by_id_and_user(todo_id: int, user_id: int, db: Session) -> Optional[Todo]:
+async def get_todo_by_id_and_user(todo_id: int, user_id: int, db: AsyncSession) -> Optional[Todo]:
     """Helper function to get a todo by ID and user, or None if not found"""
-    return db.query(Todo).filter(
+    return await db.scalar(select(Todo).where(
         Todo.id == todo_id,
         Todo.created_by == user_id
-    ).first()
+    ))
+
+
+async def bump_todos_version(db: AsyncSession, user_id: int):
+    """Mark the user's todos as changed, invalidating list_todos ETags"""
+    await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(todos_version=User.todos_version + 1)
+    )
+
+
+def todos_etag(user_id: int, version: int, request: Request) -> str:
+    """ETag for a list_todos response: changes with the todos or the request"""
+    key = f"{user_id}:{version}:{request.url.query}:{request.headers.get('accept', '')}"
+    return '"' + hashlib.blake2b(key.encode(), digest_size=16).hexdigest() + '"'
+
+
+def todo_update_values(update_data: dict) -> dict:
+    """Column values for a todo update, setting completed_at to match is_completed"""
+    if "is_completed" in update_data:
+        update_data["completed_at"] = (
+            utcnow() if update_data["is_completed"] else None
+        )
+    return update_data
+
+
+TODO_FIELDS = frozenset(TodoResponse.model_fields)
+
+SORT_COLUMNS = {
+    SortField.name: Todo.name,
+    SortField.creation_date: Todo.creation_date,
+    SortField.due_date: Todo.due_date,
+}
+
+# is_completed value to filter on; "all" and "" are absent (no filter)
+COMPLETED_FILTER = {
+    CompletedFilter.true: True,
+    CompletedFilter.false: False,
+}
+
+
+def parse_fields(fields: Optional[str]) -> Optional[list[str]]:
+    """Parse a comma-separated ?fields= list of todo fields (None = all)"""
+    if not fields:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in TODO_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+    if "id" not in names:
+        names.insert(0, "id")
+    return names
+
+
+async def stream_todos_ndjson(db: AsyncSession, stmt, selected: Optional[list[str]]):
+    """Yield the todos selected by stmt as NDJSON lines as rows arrive"""
+    result = await db.stream_scalars(stmt.execution_options(yield_per=100))
+    async for todo in result:
+        if selected:
+            line = TodoFieldsResponse(
+                **{name: getattr(todo, name) for name in selected}
+            ).model_dump_json(exclude_unset=True)
+        else:
+            line = TodoResponse.model_validate(todo).model_dump_json()
+        yield line.encode() + b"\n"
+
+
+def encode_cursor(sort_by: str, value: Any, todo_id: int) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort_by, value, todo_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str, sort_by: str) -> tuple[Any, int]:
+    """Decode a cursor from encode_cursor into (sort value, todo id)"""
+    try:
+        parsed = json.loads(base64.urlsafe_b64decode(cursor))
+        if not isinstance(parsed, list) or len(parsed) != 3:
+            raise ValueError("cursor is not a [sort_by, value, id] list")
+        cursor_sort_by, value, todo_id = parsed
+        if cursor_sort_by != sort_by:
+            raise ValueError("cursor does not match sort")
+        if isinstance(todo_id, bool) or not isinstance(todo_id, int):
+            raise ValueError("cursor id is not an integer")
+        if value is not None and not isinstance(value, str):
+            raise ValueError("cursor value is not a string")
+        if value is not None and sort_by != "name":
+            value = datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return value, todo_id
+
+
+def keyset_filter(sort_column, ascending: bool, value: Any, last_id: int):
+    """Filter for rows after (value, last_id) in (sort_column, id) order
+    
+    list_todos orders NULLs first ascending and last descending (SQLite's
+    default, made explicit for other databases), which matters for the
+    nullable due_date column. NOT NULL columns skip the NULL handling so the
+    filter stays a plain row-value comparison an index can seek on.
+    """
+    if value is None:
+        id_after = Todo.id > last_id if ascending else Todo.id < last_id
+        after_nulls = and_(sort_column.is_(None), id_after)
+        return or_(after_nulls, sort_column.isnot(None)) if ascending else after_nulls
+    
+    # Bind the cursor value with the column's type so it is serialized the
+    # same way as stored values (tuple_ doesn't infer it from the left side)
+    cursor_key = tuple_(literal(value, sort_column.type), last_id)
+    if ascending:
+        return tuple_(sort_column, Todo.id) > cursor_key
+    if not sort_column.expression.nullable:
+        return tuple_(sort_column, Todo.id) < cursor_key
+    return or_(
+        tuple_(sort_column, Todo.id) < cursor_key,
+        sort_column.is_(None)
+    )
 
 # CORS middleware
 app.add_middleware(
@@ -59,39 +208,61 @@ app.add_middleware(
 
 @app.on_event("startup")
 async def startup_event():
-    init_db()
+    await init_db()
+    # Password hashing runs in the threadpool; raise anyio's default of 40
+    # threads so a burst of logins doesn't queue behind it
+    anyio.to_thread.current_default_thread_limiter().total_tokens = 100
+    # Periodically shut down MCP subprocesses of users who have gone idle
+    app.state.mcp_sweeper = asyncio.create_task(run_manager_sweeper())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.mcp_sweeper.cancel()
+    await close_all_managers()
 
 
 @app.post("/api/auth/register", response_model=UserResponse)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
-    # Check if username exists
-    if get_user_by_username(db, user.username):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered"
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    hashed_password = await run_in_threadpool(get_password_hash, user.password)
+    # Let the unique indexes on username and email reject duplicates, which
+    # is atomic and spares a lookup before every insert. RETURNING reads back
+    # id and created_at without a separate refresh.
+    try:
+        db_user = await db.scalar(
+            insert(User)
+            .values(
+                username=user.username,
+                email=user.email,
+                hashed_password=hashed_password
+            )
+            .returning(User)
         )
-    # Check if email exists
-    if get_user_by_email(db, user.email):
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        # Find out which one clashed to report it; anything else is a real error
+        taken = (await db.execute(
+            select(User.username, User.email).where(
+                or_(User.username == user.username, User.email == user.email)
+            )
+        )).all()
+        if any(row.username == user.username for row in taken):
+            detail = "Username already registered"
+        elif any(row.email == user.email for row in taken):
+            detail = "Email already registered"
+        else:
+            raise
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
+            detail=detail
         )
-    
-    hashed_password = get_password_hash(user.password)
-    db_user = User(
-        username=user.username,
-        email=user.email,
-        hashed_password=hashed_password
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
     return db_user
 
 
 @app.post("/api/auth/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -105,64 +276,167 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
     return {"access_token": access_token, "token_type": "bearer"}
 
 
+@app.post("/api/auth/logout")
+async def logout(
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_user)
+):
+    """Drop server-side state cached for this token. JWTs are stateless, so
+    the token itself stays valid until it expires; clients should discard it."""
+    invalidate_cached_user(token)
+    invalidate_agent_cache(token)
+    return {"message": "Logged out successfully"}
+
+
 @app.get("/api/auth/me", response_model=UserResponse)
 async def get_current_user_info(current_user: User = Depends(get_current_user)):
     return current_user
 
 
-@app.get("/api/todos", response_model=TodoListResponse)
+@app.get(
+    "/api/todos",
+    response_model=Union[TodoListResponse, TodoCursorListResponse],
+    response_model_exclude_unset=True
+)
 async def list_todos(
+    request: Request,
+    response: Response,
     search: Optional[str] = Query(None, description="Search in name and description"),
-    sort_by: Optional[str] = Query("creation_date", description="Sort by: name, creation_date, due_date"),
-    sort_order: Optional[str] = Query("desc", description="Sort order: asc or desc"),
-    completed: Optional[str] = Query("", description="Filter by completion: all, true, false (empty string = all)"),
+    search_mode: SearchMode = Query(SearchMode.fts, description="PostgreSQL search mode: fts (word match) or fuzzy (substring)"),
+    sort_by: SortField = Query(SortField.creation_date, description="Sort by: name, creation_date, due_date"),
+    sort_order: SortOrder = Query(SortOrder.desc, description="Sort order: asc or desc"),
+    completed: CompletedFilter = Query(CompletedFilter.unset, description="Filter by completion: all, true, false (empty string = all)"),
     page: Optional[int] = Query(1, ge=1, description="Page number (1-indexed)"),
     page_size: Optional[int] = Query(10, ge=1, le=100, description="Number of items per page"),
-    db: Session = Depends(get_db),
+    mode: PaginationMode = Query(PaginationMode.page, description="Pagination mode: page (offset + total) or cursor"),
+    after: Optional[str] = Query(None, description="Cursor from a previous response's next_cursor (implies mode=cursor)"),
+    fields: Optional[str] = Query(None, description="Comma-separated todo fields to return, e.g. id,name,due_date (default: all)"),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    query = db.query(Todo).filter(Todo.created_by == current_user.id)
+    # Conditional GET: every todo mutation bumps the user's todos_version, so
+    # an unchanged version means the client's copy is still current. Read it
+    # from the database since current_user may come from the auth cache.
+    version = await db.scalar(
+        select(User.todos_version).where(User.id == current_user.id)
+    )
+    etag = todos_etag(current_user.id, version, request)
+    cache_headers = {"ETag": etag, "Cache-Control": "private, max-age=0, must-revalidate"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+    response.headers.update(cache_headers)
+    
+    # Collect the predicates once so the COUNT can reuse them without the
+    # ORDER BY / column list of the page query
+    filters = [Todo.created_by == current_user.id]
     
     # Completion filter - empty string or "all" shows all todos
-    if completed == "true":
-        query = query.filter(Todo.is_completed == True)
-    elif completed == "false":
-        query = query.filter(Todo.is_completed == False)
-    # If empty string, "all", or None, don't filter by completion (show all)
+    is_completed = COMPLETED_FILTER.get(completed)
+    if is_completed is not None:
+        filters.append(Todo.is_completed == is_completed)
     
     # Search filter
     if search:
-        query = query.filter(
-            or_(
-                Todo.name.contains(search),
-                Todo.description.contains(search)
+        dialect = db.bind.dialect.name
+        # The trigram FTS index needs at least three characters to match
+        if dialect == "sqlite" and len(search) >= 3:
+            filters.append(Todo.id.in_(
+                select(todos_fts.c.rowid).where(
+                    text("todos_fts MATCH :q").bindparams(q=fts_match_query(search))
+                )
+            ))
+        elif dialect == "postgresql" and search_mode is not SearchMode.fuzzy:
+            filters.append(tsv_match(search))
+        else:
+            # ILIKE on PostgreSQL, served by the trigram GIN indexes; % and _
+            # in the search text are matched literally
+            filters.append(
+                or_(
+                    Todo.name.icontains(search, autoescape=True),
+                    Todo.description.icontains(search, autoescape=True)
+                )
             )
-        )
     
-    # Get total count before pagination
-    total = query.count()
+    query = select(Todo).where(*filters)
     
     # Sorting
-    sort_column = {
-        "name": Todo.name,
-        "creation_date": Todo.creation_date,
-        "due_date": Todo.due_date
-    }.get(sort_by, Todo.creation_date)
+    sort_column = SORT_COLUMNS[sort_by]
+    ascending = sort_order is SortOrder.asc
     
-    if sort_order == "asc":
-        query = query.order_by(asc(sort_column))
-    else:
-        query = query.order_by(desc(sort_column))
+    # creation_date has one-second resolution, so break ties by id to keep
+    # insertion order stable. For nullable due_date, NULL placement is pinned
+    # to SQLite's default so keyset cursors behave the same on every database;
+    # NOT NULL columns get no NULLS clause, which would keep PostgreSQL from
+    # walking their default-ordered indexes.
+    direction = asc if ascending else desc
+    sort_key = direction(sort_column)
+    if sort_column.expression.nullable:
+        sort_key = sort_key.nulls_first() if ascending else sort_key.nulls_last()
+    ordered = query.order_by(sort_key, direction(Todo.id))
+    
+    # Only load the requested columns (plus the sort key, which the cursor
+    # needs); the rest are neither fetched nor returned
+    selected = parse_fields(fields)
+    if selected:
+        ordered = ordered.options(load_only(
+            *(getattr(Todo, name) for name in selected), sort_column,
+            raiseload=settings.DEBUG
+        ))
+    # Responses serialize plain columns only. In debug, make any relationship
+    # (or unloaded column) access fail loudly instead of issuing a query per row.
+    if settings.DEBUG:
+        ordered = ordered.options(raiseload("*"))
+    
+    def serialize(todos):
+        if not selected:
+            return todos
+        return [{name: getattr(todo, name) for name in selected} for todo in todos]
+    
+    # Keyset pagination: seek past the last row of the previous page instead
+    # of counting and skipping rows
+    if mode is PaginationMode.cursor or after:
+        if after:
+            value, last_id = decode_cursor(after, sort_by)
+            ordered = ordered.where(keyset_filter(sort_column, ascending, value, last_id))
+        todos = (await db.scalars(ordered.limit(page_size + 1))).all()
+        has_more = len(todos) > page_size
+        todos = todos[:page_size]
+        next_cursor = None
+        if has_more:
+            last = todos[-1]
+            next_cursor = encode_cursor(sort_by, getattr(last, sort_by), last.id)
+        return {
+            "todos": serialize(todos),
+            "page_size": page_size,
+            "next_cursor": next_cursor,
+            "has_more": has_more
+        }
+    
+    # Get total count before pagination
+    total = (await db.execute(select(func.count(Todo.id)).where(*filters))).scalar_one()
+    query = ordered
     
     # Pagination
     offset = (page - 1) * page_size
-    todos = query.offset(offset).limit(page_size).all()
+    query = query.offset(offset).limit(page_size)
     
     # Calculate total pages
     total_pages = (total + page_size - 1) // page_size if total > 0 else 1
     
+    # NDJSON: one todo per line, streamed from the database cursor, with the
+    # pagination totals in headers
+    if "application/x-ndjson" in request.headers.get("accept", ""):
+        return StreamingResponse(
+            stream_todos_ndjson(db, query, selected),
+            media_type="application/x-ndjson",
+            headers={"X-Total-Count": str(total), "X-Total-Pages": str(total_pages), **cache_headers}
+        )
+    
+    todos = (await db.scalars(query)).all()
+    
     return {
-        "todos": todos,
+        "todos": serialize(todos),
         "total": total,
         "page": page,
         "page_size": page_size,
@@ -173,28 +447,107 @@ async def list_todos(
 @app.post("/api/todos", response_model=TodoResponse)
 async def create_todo(
     todo: TodoCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    db_todo = Todo(
-        name=todo.name,
-        description=todo.description,
-        due_date=todo.due_date,
-        created_by=current_user.id
+    # RETURNING reads back id and creation_date without a separate refresh
+    db_todo = await db.scalar(
+        insert(Todo)
+        .values(
+            name=todo.name,
+            description=todo.description,
+            due_date=todo.due_date,
+            created_by=current_user.id
+        )
+        .returning(Todo)
     )
-    db.add(db_todo)
-    db.commit()
-    db.refresh(db_todo)
+    await bump_todos_version(db, current_user.id)
+    await db.commit()
     return db_todo
 
 
+# Bulk endpoints apply a whole batch in one request and one transaction. They
+# must be registered before the /api/todos/{todo_id} routes.
+@app.post("/api/todos/bulk", response_model=list[TodoResponse])
+async def create_todos_bulk(
+    todos: list[TodoCreate] = Body(min_length=1, max_length=100),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    created = (await db.scalars(
+        insert(Todo).returning(Todo, sort_by_parameter_order=True),
+        [{**todo.model_dump(), "created_by": current_user.id} for todo in todos]
+    )).all()
+    await bump_todos_version(db, current_user.id)
+    await db.commit()
+    return created
+
+
+@app.patch("/api/todos/bulk", response_model=list[TodoResponse])
+async def update_todos_bulk(
+    updates: list[TodoBulkUpdate] = Body(min_length=1, max_length=100),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Apply several todo updates atomically; 404 if any todo is missing"""
+    todos = []
+    missing = []
+    for todo_update in updates:
+        update_data = todo_update.model_dump(exclude={"id"}, exclude_unset=True)
+        if update_data:
+            todo = await db.scalar(
+                update(Todo)
+                .where(Todo.id == todo_update.id, Todo.created_by == current_user.id)
+                .values(**todo_update_values(update_data))
+                .returning(Todo)
+            )
+        else:
+            todo = await get_todo_by_id_and_user(todo_update.id, current_user.id, db)
+        if todo is None:
+            missing.append(todo_update.id)
+        todos.append(todo)
+    if missing:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Todos not found: {missing}"
+        )
+    await bump_todos_version(db, current_user.id)
+    await db.commit()
+    return todos
+
+
+@app.delete("/api/todos/bulk")
+async def delete_todos_bulk(
+    todo_delete: TodoBulkDelete,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Delete several todos atomically; 404 if any todo is missing"""
+    deleted_ids = set((await db.scalars(
+        delete(Todo)
+        .where(Todo.id.in_(todo_delete.ids), Todo.created_by == current_user.id)
+        .returning(Todo.id)
+    )).all())
+    missing = [todo_id for todo_id in todo_delete.ids if todo_id not in deleted_ids]
+    if missing:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Todos not found: {missing}"
+        )
+    await bump_todos_version(db, current_user.id)
+    await db.commit()
+    return {"message": f"Deleted {len(deleted_ids)} todos"}
+
+
 @app.get("/api/todos/{todo_id}", response_model=TodoResponse)
 async def get_todo(
     todo_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    todo = get_todo_by_id_and_user(todo_id, current_user.id, db)
+    todo = await get_todo_by_id_and_user(todo_id, current_user.id, db)
     if not todo:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -207,75 +560,82 @@ async def get_todo(
 async def update_todo(
     todo_id: int,
     todo_update: TodoUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    todo = get_todo_by_id_and_user(todo_id, current_user.id, db)
+    # Update fields if provided
+    update_data = todo_update.model_dump(exclude_unset=True)
+    if not update_data:
+        todo = await get_todo_by_id_and_user(todo_id, current_user.id, db)
+    else:
+        # Scope, update and read back the row in a single statement
+        todo = await db.scalar(
+            update(Todo)
+            .where(Todo.id == todo_id, Todo.created_by == current_user.id)
+            .values(**todo_update_values(update_data))
+            .returning(Todo)
+        )
+        if todo:
+            await bump_todos_version(db, current_user.id)
+            await db.commit()
     if not todo:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Todo not found"
         )
-    
-    # Update fields if provided
-    update_data = todo_update.model_dump(exclude_unset=True)
-    
-    # Handle is_completed change - set completed_at accordingly
-    if "is_completed" in update_data:
-        if update_data["is_completed"]:
-            todo.completed_at = datetime.utcnow()
-        else:
-            todo.completed_at = None
-    
-    for field, value in update_data.items():
-        if field != "is_completed":  # Already handled above
-            setattr(todo, field, value)
-    
-    db.commit()
-    db.refresh(todo)
     return todo
 
 
 @app.patch("/api/todos/{todo_id}/toggle-complete", response_model=TodoResponse)
 async def toggle_todo_complete(
     todo_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Toggle the completion status of a todo"""
-    todo = get_todo_by_id_and_user(todo_id, current_user.id, db)
+    # Flip the flag in the database rather than reading it first. SET
+    # expressions see the pre-update row, so completed_at is set when the todo
+    # was incomplete and cleared when it was completed.
+    todo = await db.scalar(
+        update(Todo)
+        .where(Todo.id == todo_id, Todo.created_by == current_user.id)
+        .values(
+            is_completed=~Todo.is_completed,
+            completed_at=case(
+                (Todo.is_completed == False, utcnow()),
+                else_=None
+            )
+        )
+        .returning(Todo)
+    )
     if not todo:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Todo not found"
         )
-    
-    todo.is_completed = not todo.is_completed
-    # Set completed_at when marking as completed, clear when uncompleting
-    if todo.is_completed:
-        todo.completed_at = datetime.utcnow()
-    else:
-        todo.completed_at = None
-    
-    db.commit()
-    db.refresh(todo)
+    await bump_todos_version(db, current_user.id)
+    await db.commit()
     return todo
 
 
 @app.delete("/api/todos/{todo_id}")
 async def delete_todo(
     todo_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    todo = get_todo_by_id_and_user(todo_id, current_user.id, db)
-    if not todo:
+    deleted_id = await db.scalar(
+        delete(Todo)
+        .where(Todo.id == todo_id, Todo.created_by == current_user.id)
+        .returning(Todo.id)
+    )
+    if deleted_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Todo not found"
         )
-    db.delete(todo)
-    db.commit()
+    await bump_todos_version(db, current_user.id)
+    await db.commit()
     return {"message": "Todo deleted successfully"}
 
 
@@ -287,39 +647,23 @@ async def chat_with_agent(
 ):
     """Chat endpoint that uses the ReAct agent with MCP tools"""
     try:
-        from agent.agent import create_react_agent, chat_with_agent
-        
-        # Create or get cached agent for this user
-        # Note: We need to recreate agents when tokens expire, so caching might not be ideal
-        # For now, create a new agent each time (can be optimized later)
+        # Create or get cached agent for this user (cached per token, so a
+        # new token after expiry gets a fresh agent)
         agent = await create_react_agent(
             auth_token=token,
             api_base_url=settings.API_BASE_URL
         )
         
-        # Convert conversation history format
-        from langchain_core.messages import HumanMessage, AIMessage
-        history = []
-        for msg in chat_message.conversation_history:
-            if msg.get("role") == "user":
-                history.append(HumanMessage(content=msg.get("content", "")))
-            elif msg.get("role") == "assistant":
-                history.append(AIMessage(content=msg.get("content", "")))
-        
-        response = await chat_with_agent(agent, chat_message.message, history)
+        # The agent converts {"role", "content"} history entries itself
+        response = await run_agent_chat(
+            agent, chat_message.message, chat_message.conversation_history
+        )
         return ChatResponse(response=response)
     except Exception as e:
-        import traceback
-        import sys
-        error_detail = str(e)
-        error_traceback = traceback.format_exc()
-        # Log to stderr so it shows in terminal
-        print(f"Chat error: {error_detail}", file=sys.stderr)
-        print(f"Traceback: {error_traceback}", file=sys.stderr)
-        sys.stderr.flush()
+        logger.exception("Chat error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error in chat: {error_detail}"
+            detail=f"Error in chat: {str(e)}"
         )
 
 
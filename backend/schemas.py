@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr
-from datetime import datetime
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
+from datetime import datetime, timezone
+from enum import StrEnum
+from typing import Optional, List, Union
 
 
 class UserCreate(BaseModel):
@@ -10,25 +11,33 @@ class UserCreate(BaseModel):
 
 
 class UserResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     username: str
     email: str
     created_at: datetime
 
-    class Config:
-        from_attributes = True
-
 
 class Token(BaseModel):
     access_token: str
     token_type: str
 
 
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Convert an aware datetime to the naive UTC form timestamps are stored in"""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
 class TodoCreate(BaseModel):
     name: str
     description: Optional[str] = None
     due_date: Optional[datetime] = None
 
+    _due_date_utc = field_validator("due_date")(naive_utc)
+
 
 class TodoUpdate(BaseModel):
     name: Optional[str] = None
@@ -36,8 +45,48 @@ class TodoUpdate(BaseModel):
     due_date: Optional[datetime] = None
     is_completed: Optional[bool] = None
 
+    _due_date_utc = field_validator("due_date")(naive_utc)
+
+
+class TodoBulkUpdate(TodoUpdate):
+    id: int
+
+
+class TodoBulkDelete(BaseModel):
+    ids: List[int] = Field(min_length=1, max_length=100)
+
+
+class SortField(StrEnum):
+    name = "name"
+    creation_date = "creation_date"
+    due_date = "due_date"
+
+
+class SortOrder(StrEnum):
+    asc = "asc"
+    desc = "desc"
+
+
+class CompletedFilter(StrEnum):
+    all = "all"
+    true = "true"
+    false = "false"
+    unset = ""  # same as all
+
+
+class SearchMode(StrEnum):
+    fts = "fts"
+    fuzzy = "fuzzy"
+
+
+class PaginationMode(StrEnum):
+    page = "page"
+    cursor = "cursor"
+
 
 class TodoResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     name: str
     description: Optional[str]
@@ -47,14 +96,29 @@ class TodoResponse(BaseModel):
     is_completed: bool
     completed_at: Optional[datetime]
 
-    class Config:
-        from_attributes = True
+
+class TodoFieldsResponse(BaseModel):
+    """A todo trimmed to the fields requested with ?fields="""
+    id: int
+    name: Optional[str] = None
+    description: Optional[str] = None
+    creation_date: Optional[datetime] = None
+    due_date: Optional[datetime] = None
+    created_by: Optional[int] = None
+    is_completed: Optional[bool] = None
+    completed_at: Optional[datetime] = None
 
 
 class TodoListResponse(BaseModel):
-    todos: List[TodoResponse]
+    todos: List[Union[TodoResponse, TodoFieldsResponse]]
     total: int
     page: int
     page_size: int
     total_pages: int
 
+
+class TodoCursorListResponse(BaseModel):
+    todos: List[Union[TodoResponse, TodoFieldsResponse]]
+    page_size: int
+    next_cursor: Optional[str]
+    has_more: bool
@@ -8,6 +8,18 @@ from mcp.types import Tool, TextContent
 from pydantic import BaseModel, Field
 import json
 
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
+
+
+def _jdump(obj: Any) -> str:
+    """Pretty-print a tool result as JSON (orjson encodes datetimes natively)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, indent=2, default=str)
+
 
 class TodoCreateInput(BaseModel):
     name: str = Field(description="The name/title of the todo item")
@@ -15,6 +27,10 @@ class TodoCreateInput(BaseModel):
     due_date: str | None = Field(None, description="Optional due date in ISO format (YYYY-MM-DDTHH:MM:SS)")
 
 
+class TodoCreateBulkInput(BaseModel):
+    items: list[TodoCreateInput] = Field(description="The todo items to create")
+
+
 class TodoUpdateInput(BaseModel):
     todo_id: int = Field(description="The ID of the todo to update")
     name: str | None = Field(None, description="Updated name/title")
@@ -45,13 +61,15 @@ class TodoGetInput(BaseModel):
 # Note: Each MCP server subprocess has its own TokenStore instance.
 # The token is read from the subprocess's environment variables at initialization,
 # which are set uniquely for each user's MCP client connection.
+# When the tools are called in-process (see agent/mcp_client.py), the caller
+# passes its own TokenStore per user instead of relying on the module-level one.
 class TokenStore:
-    def __init__(self):
+    def __init__(self, token: str | None = None, api_base_url: str | None = None):
         # Read from environment variables (set by MCP client for this subprocess)
         # Each subprocess gets its own isolated environment, so concurrent users
         # have separate token stores with their own authentication tokens.
-        self.token: str | None = os.getenv("MCP_AUTH_TOKEN")
-        self.api_base_url: str = os.getenv("MCP_API_BASE_URL", "http://localhost:8000")
+        self.token: str | None = token or os.getenv("MCP_AUTH_TOKEN")
+        self.api_base_url: str = api_base_url or os.getenv("MCP_API_BASE_URL", "http://localhost:8000")
     
     def set_token(self, token: str):
         self.token = token
@@ -68,22 +86,50 @@ class TokenStore:
 token_store = TokenStore()
 
 
-async def create_todo_tool(arguments: dict) -> list[TextContent]:
+# One pooled client per API base URL, reused by every tool call so requests
+# keep their connections (and HTTP/2 streams) warm instead of handshaking per
+# call. Tokens differ per store, so auth headers are still sent per request.
+_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def get_client(store: TokenStore) -> httpx.AsyncClient:
+    client = _clients.get(store.api_base_url)
+    if client is None:
+        client = httpx.AsyncClient(
+            base_url=store.api_base_url,
+            http2=True,
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=20)
+        )
+        _clients[store.api_base_url] = client
+    return client
+
+
+async def close_clients():
+    """Close the pooled HTTP clients (e.g. on shutdown)"""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+async def create_todo_tool(arguments: dict, store: TokenStore | None = None) -> list[TextContent]:
     """Create a new todo item"""
+    store = store or token_store
     try:
         input_data = TodoCreateInput(**arguments)
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{token_store.api_base_url}/api/todos",
-                json=input_data.model_dump(exclude_none=True),
-                headers=token_store.get_headers()
-            )
-            response.raise_for_status()
-            result = response.json()
-            return [TextContent(
-                type="text",
-                text=f"Successfully created todo: {json.dumps(result, indent=2)}"
-            )]
+        client = get_client(store)
+        response = await client.post(
+            "/api/todos",
+            json=input_data.model_dump(exclude_none=True),
+            headers=store.get_headers()
+        )
+        response.raise_for_status()
+        result = response.json()
+        return [TextContent(
+            type="text",
+            text=f"Successfully created todo: {_jdump(result)}"
+        )]
     except httpx.HTTPStatusError as e:
         return [TextContent(
             type="text",
@@ -96,8 +142,38 @@ async def create_todo_tool(arguments: dict) -> list[TextContent]:
         )]
 
 
-async def list_todos_tool(arguments: dict) -> list[TextContent]:
+async def create_todos_tool(arguments: dict, store: TokenStore | None = None) -> list[TextContent]:
+    """Create several todo items in one request"""
+    store = store or token_store
+    try:
+        input_data = TodoCreateBulkInput(**arguments)
+        client = get_client(store)
+        response = await client.post(
+            "/api/todos/bulk",
+            json=[item.model_dump(exclude_none=True) for item in input_data.items],
+            headers=store.get_headers()
+        )
+        response.raise_for_status()
+        result = response.json()
+        return [TextContent(
+            type="text",
+            text=f"Successfully created {len(result)} todos: {_jdump(result)}"
+        )]
+    except httpx.HTTPStatusError as e:
+        return [TextContent(
+            type="text",
+            text=f"Error creating todos: {e.response.status_code} - {e.response.text}"
+        )]
+    except Exception as e:
+        return [TextContent(
+            type="text",
+            text=f"Error creating todos: {str(e)}"
+        )]
+
+
+async def list_todos_tool(arguments: dict, store: TokenStore | None = None) -> list[TextContent]:
     """List all todos for the authenticated user"""
+    store = store or token_store
     try:
         input_data = TodoListInput(**arguments)
         params = {}
@@ -108,18 +184,25 @@ async def list_todos_tool(arguments: dict) -> list[TextContent]:
         if input_data.sort_order:
             params["sort_order"] = input_data.sort_order
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{token_store.api_base_url}/api/todos",
-                params=params,
-                headers=token_store.get_headers()
-            )
-            response.raise_for_status()
-            result = response.json()
-            return [TextContent(
-                type="text",
-                text=f"Todos: {json.dumps(result, indent=2, default=str)}"
-            )]
+        client = get_client(store)
+        # The list can be long, so pass the backend's JSON through as it
+        # streams in rather than decoding and re-encoding it
+        body = bytearray()
+        async with client.stream(
+            "GET",
+            "/api/todos",
+            params=params,
+            headers=store.get_headers()
+        ) as response:
+            if response.is_error:
+                await response.aread()
+                response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                body += chunk
+        return [TextContent(
+            type="text",
+            text=f"Todos: {body.decode()}"
+        )]
     except httpx.HTTPStatusError as e:
         return [TextContent(
             type="text",
@@ -132,21 +215,22 @@ async def list_todos_tool(arguments: dict) -> list[TextContent]:
         )]
 
 
-async def get_todo_tool(arguments: dict) -> list[TextContent]:
+async def get_todo_tool(arguments: dict, store: TokenStore | None = None) -> list[TextContent]:
     """Get a specific todo by ID"""
+    store = store or token_store
     try:
         input_data = TodoGetInput(**arguments)
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{token_store.api_base_url}/api/todos/{input_data.todo_id}",
-                headers=token_store.get_headers()
-            )
-            response.raise_for_status()
-            result = response.json()
-            return [TextContent(
-                type="text",
-                text=f"Todo: {json.dumps(result, indent=2, default=str)}"
-            )]
+        client = get_client(store)
+        response = await client.get(
+            f"/api/todos/{input_data.todo_id}",
+            headers=store.get_headers()
+        )
+        response.raise_for_status()
+        result = response.json()
+        return [TextContent(
+            type="text",
+            text=f"Todo: {_jdump(result)}"
+        )]
     except httpx.HTTPStatusError as e:
         return [TextContent(
             type="text",
@@ -159,25 +243,26 @@ async def get_todo_tool(arguments: dict) -> list[TextContent]:
         )]
 
 
-async def update_todo_tool(arguments: dict) -> list[TextContent]:
+async def update_todo_tool(arguments: dict, store: TokenStore | None = None) -> list[TextContent]:
     """Update an existing todo item"""
+    store = store or token_store
     try:
         input_data = TodoUpdateInput(**arguments)
         todo_id = input_data.todo_id
         update_data = input_data.model_dump(exclude={"todo_id"}, exclude_none=True)
         
-        async with httpx.AsyncClient() as client:
-            response = await client.put(
-                f"{token_store.api_base_url}/api/todos/{todo_id}",
-                json=update_data,
-                headers=token_store.get_headers()
-            )
-            response.raise_for_status()
-            result = response.json()
-            return [TextContent(
-                type="text",
-                text=f"Successfully updated todo: {json.dumps(result, indent=2, default=str)}"
-            )]
+        client = get_client(store)
+        response = await client.put(
+            f"/api/todos/{todo_id}",
+            json=update_data,
+            headers=store.get_headers()
+        )
+        response.raise_for_status()
+        result = response.json()
+        return [TextContent(
+            type="text",
+            text=f"Successfully updated todo: {_jdump(result)}"
+        )]
     except httpx.HTTPStatusError as e:
         return [TextContent(
             type="text",
@@ -190,21 +275,22 @@ async def update_todo_tool(arguments: dict) -> list[TextContent]:
         )]
 
 
-async def toggle_todo_complete_tool(arguments: dict) -> list[TextContent]:
+async def toggle_todo_complete_tool(arguments: dict, store: TokenStore | None = None) -> list[TextContent]:
     """Toggle the completion status of a todo"""
+    store = store or token_store
     try:
         input_data = TodoToggleCompleteInput(**arguments)
-        async with httpx.AsyncClient() as client:
-            response = await client.patch(
-                f"{token_store.api_base_url}/api/todos/{input_data.todo_id}/toggle-complete",
-                headers=token_store.get_headers()
-            )
-            response.raise_for_status()
-            result = response.json()
-            return [TextContent(
-                type="text",
-                text=f"Successfully toggled todo completion: {json.dumps(result, indent=2, default=str)}"
-            )]
+        client = get_client(store)
+        response = await client.patch(
+            f"/api/todos/{input_data.todo_id}/toggle-complete",
+            headers=store.get_headers()
+        )
+        response.raise_for_status()
+        result = response.json()
+        return [TextContent(
+            type="text",
+            text=f"Successfully toggled todo completion: {_jdump(result)}"
+        )]
     except httpx.HTTPStatusError as e:
         return [TextContent(
             type="text",
@@ -217,20 +303,21 @@ async def toggle_todo_complete_tool(arguments: dict) -> list[TextContent]:
         )]
 
 
-async def delete_todo_tool(arguments: dict) -> list[TextContent]:
+async def delete_todo_tool(arguments: dict, store: TokenStore | None = None) -> list[TextContent]:
     """Delete a todo item"""
+    store = store or token_store
     try:
         input_data = TodoDeleteInput(**arguments)
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(
-                f"{token_store.api_base_url}/api/todos/{input_data.todo_id}",
-                headers=token_store.get_headers()
-            )
-            response.raise_for_status()
-            return [TextContent(
-                type="text",
-                text=f"Successfully deleted todo {input_data.todo_id}"
-            )]
+        client = get_client(store)
+        response = await client.delete(
+            f"/api/todos/{input_data.todo_id}",
+            headers=store.get_headers()
+        )
+        response.raise_for_status()
+        return [TextContent(
+            type="text",
+            text=f"Successfully deleted todo {input_data.todo_id}"
+        )]
     except httpx.HTTPStatusError as e:
         return [TextContent(
             type="text",
@@ -264,6 +351,29 @@ async def list_tools() -> list[Tool]:
                 "required": ["name"]
             }
         ),
+        Tool(
+            name="create_todos",
+            description="Create several todo items at once. Prefer this over repeated create_todo calls. Requires authentication token.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "items": {
+                        "type": "array",
+                        "description": "The todo items to create",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "name": {"type": "string", "description": "The name/title of the todo item"},
+                                "description": {"type": "string", "description": "Optional description"},
+                                "due_date": {"type": "string", "description": "Optional due date in ISO format"}
+                            },
+                            "required": ["name"]
+                        }
+                    }
+                },
+                "required": ["items"]
+            }
+        ),
         Tool(
             name="list_todos",
             description="List all todos for the authenticated user. Supports search and sorting.",
@@ -327,30 +437,35 @@ async def list_tools() -> list[Tool]:
     ]
 
 
+TOOL_HANDLERS = {
+    "create_todo": create_todo_tool,
+    "create_todos": create_todos_tool,
+    "list_todos": list_todos_tool,
+    "get_todo": get_todo_tool,
+    "update_todo": update_todo_tool,
+    "toggle_todo_complete": toggle_todo_complete_tool,
+    "delete_todo": delete_todo_tool,
+}
+
+
 @server.call_tool()
 async def call_tool(name: str, arguments: dict) -> list[TextContent]:
-    tool_map = {
-        "create_todo": create_todo_tool,
-        "list_todos": list_todos_tool,
-        "get_todo": get_todo_tool,
-        "update_todo": update_todo_tool,
-        "toggle_todo_complete": toggle_todo_complete_tool,
-        "delete_todo": delete_todo_tool,
-    }
-    
-    if name not in tool_map:
+    if name not in TOOL_HANDLERS:
         raise ValueError(f"Unknown tool: {name}")
     
-    return await tool_map[name](arguments)
+    return await TOOL_HANDLERS[name](arguments)
 
 
 async def main():
-    async with stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            server.create_initialization_options()
-        )
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await server.run(
+                read_stream,
+                write_stream,
+                server.create_initialization_options()
+            )
+    finally:
+        await close_clients()
 
 
 if __name__ == "__main__":
@@ -26,6 +26,8 @@ except ImportError:
     sys.exit(1)
 
 if __name__ == "__main__":
+    # Read APP_ENV / WEB_CONCURRENCY from .env as well as the environment
+    from backend import _env  # noqa: F401
 
     # Configure uvicorn with explicit logging
     import logging
@@ -39,13 +41,21 @@ if __name__ == "__main__":
         os.path.join(project_root, "mcp_server"),
     ]
     
+    # APP_ENV=dev (the default) runs a single auto-reloading worker with access
+    # logs; any other value runs WEB_CONCURRENCY workers without either. Each
+    # worker has its own DB connection pool (see DB_POOL_SIZE in
+    # backend/config.py). uvicorn[standard] picks uvloop and httptools
+    # automatically where they are available.
+    reload = os.getenv("APP_ENV", "dev") == "dev"
+    workers = 1 if reload else int(os.getenv("WEB_CONCURRENCY", str(max(2, os.cpu_count() or 1))))
+
     uvicorn.run(
         "backend.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
-        reload_dirs=reload_dirs,
+        workers=workers,
+        reload=reload,
+        reload_dirs=reload_dirs if reload else None,
         log_level="info",
-        access_log=True
+        access_log=reload
     )
-
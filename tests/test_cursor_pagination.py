@@ -0,0 +1,58 @@
+"""Cursor pagination over todos written before timestamps were stored at
+seconds resolution"""
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import pytest
+
+db_path = Path(tempfile.mkdtemp()) / "todos.db"
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{db_path}"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from backend.main import app  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def auth_headers():
+    with TestClient(app) as client:
+        client.post("/api/auth/register", json={"username": "legacy", "email": "legacy@example.com", "password": "pw"})
+        token = client.post("/api/auth/login", data={"username": "legacy", "password": "pw"}).json()["access_token"]
+    # Rows as the pre-ServerTimestamp code stored them: microseconds, with
+    # pairs sharing the same second
+    with sqlite3.connect(db_path) as db:
+        db.executemany(
+            "INSERT INTO todos (name, creation_date, created_by, is_completed) VALUES (?, ?, 1, 0)",
+            [(f"legacy {i}", f"2026-10-01 10:00:{i // 2:02d}.{561970 + i}") for i in range(6)]
+        )
+    headers = {"Authorization": f"Bearer {token}"}
+    # Starting the app again migrates the legacy rows
+    with TestClient(app) as client:
+        client.post("/api/todos", json={"name": "new"}, headers=headers)
+    return headers
+
+
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+def test_cursor_pages_through_legacy_rows(auth_headers, sort_order):
+    with TestClient(app) as client:
+        params = {"sort_by": "creation_date", "sort_order": sort_order}
+        expected = [
+            todo["id"] for todo in
+            client.get("/api/todos", params={**params, "page_size": 100}, headers=auth_headers).json()["todos"]
+        ]
+        
+        seen, cursor = [], None
+        for _ in range(len(expected)):
+            page_params = {**params, "mode": "cursor", "page_size": 2}
+            if cursor:
+                page_params["after"] = cursor
+            page = client.get("/api/todos", params=page_params, headers=auth_headers).json()
+            seen += [todo["id"] for todo in page["todos"]]
+            if not page["has_more"]:
+                break
+            cursor = page["next_cursor"]
+    
+    assert len(expected) == 7
+    assert seen == expected